@@ -2,16 +2,18 @@
 API routes for the nutrition and exercise coach application.
 """
 from fastapi import APIRouter, HTTPException, status, Depends
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any
 from models import PromptRequest
-from database import create_user_from_onboarding, get_user_by_email, verify_password, get_user_profile, SessionLocal
+from flutter_models import UnifiedOnboardingRequest as OnboardingCompleteRequest, HealthLoginRequest as LoginRequest
+from database import create_user_from_onboarding, get_login_user, verify_password_async, authenticate_user, get_user_profile, SessionLocal
 from agent import get_agent_response
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 import traceback
 from datetime import datetime, timezone, timedelta
-from database import User, hash_password, DailyWeight
+from database import User, hash_password_async, DailyWeight
+from cache import profile_cache
 
 
 router = APIRouter()
@@ -74,25 +76,12 @@ class UserResponse(BaseModel):
     class Config:
         from_attributes = True
 
-class OnboardingCompleteRequest(BaseModel):
-    basicInfo: Optional[Dict[str, Any]] = {}
-    primaryGoal: Optional[str] = ""
-    weightGoal: Optional[Dict[str, Any]] = {}
-    sleepInfo: Optional[Dict[str, Any]] = {}
-    dietaryPreferences: Optional[Dict[str, Any]] = {}
-    workoutPreferences: Optional[Dict[str, Any]] = {}
-    exerciseSetup: Optional[Dict[str, Any]] = {}
-
 class OnboardingCompleteResponse(BaseModel):
     success: bool
     userId: Optional[str] = None
     message: Optional[str] = None
     error: Optional[str] = None
 
-class LoginRequest(BaseModel):
-    email: EmailStr
-    password: str
-
 class LoginResponse(BaseModel):
     success: bool
     user: Optional[Dict[str, Any]] = None
@@ -192,26 +181,21 @@ def calculate_health_metrics(height: float, weight: float, age: int, gender: str
 async def complete_onboarding(onboarding_data: OnboardingCompleteRequest):
     """Complete onboarding process for both web and Flutter applications"""
     try:
-        print(f"Received onboarding data: {onboarding_data.dict()}")
-        
         # Validate that we have basic info
-        if not onboarding_data.basicInfo or not onboarding_data.basicInfo.get('email'):
+        if not onboarding_data.basicInfo.email:
             raise HTTPException(
                 status_code=400, 
                 detail="Basic information including email is required"
             )
         
-        # Check if user already exists
-        existing_user = await get_user_by_email(onboarding_data.basicInfo.get('email'))
-        if existing_user:
+        # Create user from onboarding data; None means the email is taken
+        user_id = await create_user_from_onboarding(onboarding_data.model_dump(exclude_unset=True))
+        if user_id is None:
             raise HTTPException(
                 status_code=400,
                 detail="User with this email already exists"
             )
         
-        # Create user from onboarding data
-        user_id = await create_user_from_onboarding(onboarding_data.dict())
-        
         return OnboardingCompleteResponse(
             success=True,
             userId=user_id,
@@ -232,45 +216,14 @@ async def login_user(login_data: LoginRequest):
     """Login endpoint for both web and Flutter applications"""
     try:
         print(f"🔐 Login attempt for email: {login_data.email}")
-        print(f"🔐 Password provided length: {len(login_data.password)}")
 
         # Get user by email
-        user = await get_user_by_email(login_data.email)
-        
-        if not user:
-            print(f"❌ No user found with email: {login_data.email}")
-            raise HTTPException(
-                status_code=401,
-                detail="Invalid credentials"
-            )
-        
-        print(f"✅ User found: {user.name} (ID: {user.id})")
-        print(f"🔍 User has password: {bool(user.password)}")
-        print(f"🔍 User has password_hash: {bool(user.password_hash)}")
+        user = await get_login_user(login_data.email)
         
-        # Try both password fields for compatibility
-        password_to_verify = user.password_hash or user.password
-        
-        if not password_to_verify:
-            print(f"❌ No password found for user: {login_data.email}")
-            raise HTTPException(
-                status_code=401,
-                detail="Invalid credentials"
-            )
-        
-        print(f"🔍 Using password hash: {password_to_verify[:20]}...")
-
-        verification_result = verify_password(login_data.password, password_to_verify)
-        print(f"🧪 Password verification result: {verification_result}")
-
-        # Verify password
-        if not verification_result:
-            print(f"❌ Password verification failed for: {login_data.email}")
-
-            for test_pwd in ['defaultpassword123', '', 'password']:
-                test_result = verify_password(test_pwd, password_to_verify)
-                print(f"🧪 Test password '{test_pwd}': {test_result}")
-                
+        # Unknown emails still pay for a full verify, so response time
+        # doesn't reveal which emails are registered
+        if not await authenticate_user(user, login_data.password):
+            print(f"❌ Invalid credentials for: {login_data.email}")
             raise HTTPException(
                 status_code=401,
                 detail="Invalid credentials"
@@ -512,6 +465,7 @@ async def update_user_profile(
         # Commit changes
         await db.commit()
         await db.refresh(user)
+        profile_cache.pop(user_id, None)
         
         # Return updated user data
         return {
@@ -605,14 +559,14 @@ async def update_user_password(user_id: str, password_data: dict):
                 )
             
             # Verify current password using the same system
-            if not verify_password(current_password, password_to_verify):
+            if not await verify_password_async(current_password, password_to_verify):
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Current password is incorrect"
                 )
             
             # Hash new password with passlib (same as login system)
-            new_password_hash = hash_password(new_password)
+            new_password_hash = await hash_password_async(new_password)
             
             # Update both password fields for compatibility
             user.password = new_password_hash
@@ -939,6 +893,7 @@ async def update_user_weight(user_id: str, weight_data: WeightUpdateRequest, db:
             user.tdee = health_metrics['tdee']
         
         await db.commit()
+        profile_cache.pop(user_id, None)
         
         # FIXED: Calculate progress using helper function
         weight_change = user.starting_weight - weight_data.weight if user.starting_weight else 0
@@ -1092,6 +1047,7 @@ async def set_starting_weight(user_id: str, weight_data: dict, db: Session = Dep
         user.starting_weight_date = datetime.now(timezone.utc)
         
         await db.commit()
+        profile_cache.pop(user_id, None)
         
         print(f"✅ Starting weight set: {starting_weight} kg")
         
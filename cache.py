@@ -0,0 +1,51 @@
+"""
+In-process caching helpers for FitMind AI.
+"""
+import time
+from collections import OrderedDict
+
+class TTLCache:
+    """
+    Small dict-like cache whose entries expire ttl seconds after being set.
+    Holds at most maxsize entries, evicting the oldest first. Only touched
+    from the event loop thread, so no locking is needed.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if missing or expired."""
+        item = self._data.get(key)
+        if item is None:
+            return default
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+        return value
+
+    def __setitem__(self, key, value):
+        self._data.pop(key, None)
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """Remove key and return its value (expired or not), or default."""
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+# Formatted Flutter user profiles keyed by user id. Every route that writes
+# User columns pops the entry, but only in its own worker; other workers may
+# serve a profile up to ttl seconds old, which is acceptable for display data.
+profile_cache = TTLCache(maxsize=10_000, ttl=30)
@@ -2,21 +2,56 @@
 Configuration settings for the nutrition and exercise coach API.
 """
 import os
+import atexit
+import queue
+import logging
+from logging.handlers import QueueHandler, QueueListener
 from dotenv import load_dotenv
 from openai import OpenAI
 
 # Load environment variables
 load_dotenv()
 
-# # Configure logging
-# logging.basicConfig(level=logging.INFO)
-# # Set SQLAlchemy logging to WARNING level to reduce verbosity
-# logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)
-# # Only show actual SQL queries, not the other engine output
-# logging.getLogger('sqlalchemy.engine.Engine').setLevel(logging.WARNING)
+# Logging settings
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+def setup_logging():
+    """
+    Configure root logging so records are formatted and written by a
+    background QueueListener thread rather than on the event loop.
+    """
+    root = logging.getLogger()
+    if any(isinstance(handler, QueueHandler) for handler in root.handlers):
+        return
+    
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(
+        logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    )
+    
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(LOG_LEVEL)
+    
+    # Keep SQLAlchemy engine output out of the logs unless asked for
+    logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)
 
 # Database and API config
 DATABASE_URL = os.getenv("DATABASE_URL")
+
+# Connection pool sizing for the async engine
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "40"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Set when connecting through PgBouncer in transaction mode: PgBouncer does the
+# pooling, so the app opens a connection per checkout and skips prepared statements
+DB_USE_PGBOUNCER = os.getenv("DB_USE_PGBOUNCER", "false").lower() == "true"
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "1024"))
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 AGENTOPS_API_KEY = os.getenv("AGENTOPS_API_KEY")
 
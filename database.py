@@ -3,49 +3,59 @@ Updated unified database models for both web and Flutter applications.
 """
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from config import DATABASE_URL
+from sqlalchemy.pool import NullPool
+from config import DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_TIMEOUT, DB_STATEMENT_CACHE_SIZE, DB_USE_PGBOUNCER
 from sqlalchemy.ext.mutable import MutableList
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, UniqueConstraint, select, update, Boolean, TIMESTAMP, UUID
-from sqlalchemy.dialects.postgresql import UUID, JSONB, ARRAY
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, UniqueConstraint, select, update, Boolean, TIMESTAMP, UUID, text
+from sqlalchemy.dialects.postgresql import UUID, JSONB, ARRAY, insert as pg_insert
 from passlib.context import CryptContext
-from psycopg2.extras import RealDictCursor
-from contextlib import contextmanager
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime, timezone
-from typing import Optional
+from typing import NamedTuple, Optional
 from pydantic import BaseModel
 import os
-import psycopg2
+import logging
 import uuid
 import traceback
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
+logger = logging.getLogger(__name__)
 
-# SQLAlchemy setup
+
+# SQLAlchemy setup. This engine's pool is shared by every module in the
+# process; import engine/SessionLocal from here rather than creating another.
 Base = declarative_base()
-engine = create_async_engine(DATABASE_URL, echo=False)
-SessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-@contextmanager
-def get_health_db_cursor():
-    """Database cursor specifically for health data"""
-    conn = psycopg2.connect(
-        host=os.getenv('DB_HOST', 'localhost'),
-        port=os.getenv('DB_PORT', '5432'),
-        database=os.getenv('DB_NAME', 'health_ai_db'),
-        user=os.getenv('DB_USERNAME', 'health_ai_user'),
-        password=os.getenv('DB_PASSWORD', 'health_ai_password')
+if DB_USE_PGBOUNCER:
+    engine = create_async_engine(
+        DATABASE_URL,
+        echo=False,
+        poolclass=NullPool,
+        connect_args={"statement_cache_size": 0}
     )
-    try:
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        yield conn, cursor
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        cursor.close()
-        conn.close()
+else:
+    engine = create_async_engine(
+        DATABASE_URL,
+        echo=False,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+        connect_args={"statement_cache_size": DB_STATEMENT_CACHE_SIZE}
+    )
+SessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+# New hashes are Argon2id. bcrypt hashes from before the switch still verify,
+# and deprecated="auto" flags them so a successful login re-hashes them
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated="auto",
+    argon2__type="ID",
+    argon2__time_cost=2,
+    argon2__memory_cost=19456,
+    argon2__parallelism=1
+)
 
 class User(Base):
     """Unified database model for users - supports both web and Flutter apps."""
@@ -281,6 +291,15 @@ class SupplementTracking(Base):
     taken = Column(Boolean, default=False)
     time_taken = Column(DateTime)
     created_at = Column(TIMESTAMP(timezone=True), default=lambda: datetime.now(timezone.utc)) 
+    
+    __table_args__ = (
+        # INCLUDE lets the daily status read be answered from the index alone
+        UniqueConstraint(
+            'user_id', 'date', 'supplement_name',
+            name='supplement_tracking_user_date_name_unique',
+            postgresql_include=['taken', 'time_taken', 'dosage']
+        ),
+    )
 
 class UserSupplementPreferences(Base):
     """User supplement preferences and setup"""
@@ -296,6 +315,10 @@ class UserSupplementPreferences(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(TIMESTAMP(timezone=True), default=lambda: datetime.now(timezone.utc))
     updated_at = Column(TIMESTAMP(timezone=True), default=lambda: datetime.now(timezone.utc))
+    
+    __table_args__ = (
+        UniqueConstraint('user_id', 'supplement_name', name='user_supplement_preferences_user_name_unique'),
+    )
 
 class DailyWater(Base):
     """Daily water tracking"""
@@ -375,15 +398,114 @@ class UserNotes(Base):
         UniqueConstraint('user_id', 'key', name='user_notes_user_id_key_unique'),
     )
 
+# Secondary indexes applied at startup. create_all() only builds indexes for
+# tables it creates, so these are kept as idempotent DDL for existing databases.
+STARTUP_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_exercise_logs_user_date ON exercise_logs (user_id, exercise_date DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_exercise_logs_user_type ON exercise_logs (user_id, exercise_type)",
+    "CREATE INDEX IF NOT EXISTS idx_user_supplement_prefs_active "
+    "ON user_supplement_preferences (user_id, created_at) WHERE is_active = true",
+    "CREATE INDEX IF NOT EXISTS idx_daily_water_user_date ON daily_water (user_id, date DESC)",
+]
+
+# Unique indexes the upserts name as their ON CONFLICT arbiter. create_all()
+# builds them for new tables; existing databases get them from
+# scripts/add_supplement_indexes.sql, which clears duplicate rows first.
+# Unlike STARTUP_INDEXES these are not optional: without one, every call to
+# its upsert endpoint fails, so startup stops until the migration has run.
+UPSERT_UNIQUE_INDEXES = [
+    "supplement_tracking_user_date_name_unique",
+    "user_supplement_preferences_user_name_unique",
+]
+
+async def check_upsert_indexes():
+    """
+    Raise if an upsert arbiter index is missing. A database that can't be
+    reached is only logged, as init_database does, so it can't block startup.
+    """
+    try:
+        async with engine.connect() as conn:
+            missing = [
+                name for name in UPSERT_UNIQUE_INDEXES
+                if not await conn.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name})
+            ]
+    except Exception:
+        logger.exception("Could not check the upsert unique indexes")
+        return
+    
+    if missing:
+        message = (
+            f"Missing unique indexes {', '.join(missing)}; "
+            "run scripts/add_supplement_indexes.sql before starting the app"
+        )
+        logger.error(message)
+        raise RuntimeError(message)
+
 # Password hashing utilities
 def hash_password(password: str) -> str:
     """Hash a password for storing in database"""
     return pwd_context.hash(password)
 
-def verify_password(password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash"""
+@lru_cache(maxsize=1)
+def _dummy_password_hash() -> str:
+    """Hash verified against when there is no stored one; built on first use"""
+    return pwd_context.hash(uuid.uuid4().hex)
+
+def verify_password(password: str, hashed_password: Optional[str]) -> bool:
+    """
+    Verify a password against its hash. With no hash (unknown email, user
+    without a password) the same Argon2 work is done against a dummy hash and
+    False is returned, so response time doesn't reveal which accounts exist.
+    """
+    if not hashed_password:
+        pwd_context.verify(password, _dummy_password_hash())
+        return False
     return pwd_context.verify(password, hashed_password)
 
+# argon2-cffi and bcrypt release the GIL while hashing, so a thread pool is enough to keep
+# the slow verify off the event loop without pickling to another process
+_password_executor = ThreadPoolExecutor(
+    max_workers=os.cpu_count() or 1,
+    thread_name_prefix="password-hash"
+)
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password in the worker pool so the event loop stays responsive"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, hash_password, password)
+
+async def verify_password_async(password: str, hashed_password: Optional[str]) -> bool:
+    """Verify a password in the worker pool so the event loop stays responsive"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, verify_password, password, hashed_password)
+
+class LoginUser(NamedTuple):
+    """The fields a login needs, selected instead of the full User row"""
+    id: uuid.UUID
+    email: str
+    password_hash: Optional[str]
+
+async def authenticate_user(user: Optional[LoginUser], password: str) -> bool:
+    """
+    Check a login password for a user (None for an unknown email). A legacy
+    bcrypt hash that verifies is replaced with an Argon2id one.
+    """
+    hashed_password = user.password_hash if user else None
+    if not await verify_password_async(password, hashed_password):
+        return False
+    
+    if pwd_context.needs_update(hashed_password):
+        new_hash = await hash_password_async(password)
+        async with SessionLocal() as session:
+            await session.execute(
+                update(User)
+                .where(User.id == user.id)
+                .values(password=new_hash, password_hash=new_hash)
+            )
+            await session.commit()
+    
+    return True
+
 def parse_date_string(date_str):
     """Parse date string in ISO format"""
     if not date_str:
@@ -422,12 +544,14 @@ def parse_time_string(time_str):
     return ''
 
 # Updated user creation function for onboarding
-async def create_user_from_onboarding(onboarding_data: dict) -> str:
-    """Create a new user from onboarding data (works for both web and Flutter)"""
+async def create_user_from_onboarding(onboarding_data: dict) -> Optional[str]:
+    """
+    Create a new user from onboarding data (works for both web and Flutter).
+    Returns the new user id, or None if the email is already registered.
+    """
     async with SessionLocal() as session:
         try:
-            print("🔍 DEBUGGING USER CREATION:")
-            print(f"📧 Email: {onboarding_data.get('basicInfo', {}).get('email')}")
+            logger.debug("Creating user from onboarding data")
             
             # Extract basic info
             basic_info = onboarding_data.get('basicInfo', {})
@@ -437,23 +561,9 @@ async def create_user_from_onboarding(onboarding_data: dict) -> str:
             if not raw_password or raw_password.strip() == '':
                 raw_password = 'defaultpassword123'
             
-            print(f"🔐 DEBUGGING PASSWORD CREATION:")
-            print(f"  Raw password received: '{raw_password}'")
-            print(f"  Password length: {len(raw_password)}")
-
-            hashed_password = hash_password(raw_password)
-
-            print(f"  Hashed password length: {len(hashed_password)}")
-            print(f"  Hashed password starts with: {hashed_password[:10]}...")
+            hashed_password = await hash_password_async(raw_password)
 
             period_cycle = onboarding_data.get('periodCycle', {})
-            
-            # ADD THIS DEBUGGING
-            print(f"🌸 Period cycle data in create_user_from_onboarding:")
-            print(f"  period_cycle dict: {period_cycle}")
-            print(f"  hasPeriods: {period_cycle.get('hasPeriods')}")
-            print(f"  lastPeriodDate: {period_cycle.get('lastPeriodDate')}")
-            print(f"  cycleLength: {period_cycle.get('cycleLength')}")
 
             primary_goal = onboarding_data.get('primaryGoal', '')
             weight_goal_data = onboarding_data.get('weightGoal', {})
@@ -468,49 +578,10 @@ async def create_user_from_onboarding(onboarding_data: dict) -> str:
             bedtime_parsed = parse_time_string(bedtime_raw)
             wakeup_time_parsed = parse_time_string(wakeup_time_raw)
             
-            print(f"🕐 Time parsing:")
-            print(f"  Raw bedtime: '{bedtime_raw}' -> Parsed: '{bedtime_parsed}'")
-            print(f"  Raw wakeup: '{wakeup_time_raw}' -> Parsed: '{wakeup_time_parsed}'")
-            
+            period_length = period_cycle.get('periodLength', 5)
 
-            has_periods = None
-            last_period_date = None
-            cycle_length = None
-            period_length = None
-            cycle_length_regular = None
-            pregnancy_status = None
-            period_tracking_preference = None
-            
-            if period_cycle:
-                has_periods = period_cycle.get('hasPeriods')
-                last_period_date_str = period_cycle.get('lastPeriodDate')
-                cycle_length = period_cycle.get('cycleLength')
-                period_length = period_cycle.get('periodLength', 5)
-                cycle_length_regular = period_cycle.get('cycleLengthRegular')
-                pregnancy_status = period_cycle.get('pregnancyStatus')
-                period_tracking_preference = period_cycle.get('trackingPreference')
-                
-                # Parse last period date if provided
-                if last_period_date_str:
-                    try:
-                        last_period_date = datetime.fromisoformat(last_period_date_str.replace('Z', '+00:00'))
-                        print(f"✅ Parsed last period date: {last_period_date}")
-                    except:
-                        print(f"❌ Failed to parse last period date: {last_period_date_str}")
-                        last_period_date = None
-                
-                print(f"🌸 Processed period data:")
-                print(f"  has_periods: {has_periods}")
-                print(f"  last_period_date: {last_period_date}")
-                print(f"  cycle_length: {cycle_length}")
-                print(f"  period_length: {period_length}")
-                print(f"  cycle_length_regular: {cycle_length_regular}")
-                print(f"  pregnancy_status: {pregnancy_status}")
-                print(f"  period_tracking_preference: {period_tracking_preference}")
-
-
-            # Create new user with SNAKE_CASE field names (matching your User model)
-            new_user = User(
+            # Column values with SNAKE_CASE field names (matching your User model)
+            user_values = dict(
                 id=uuid.uuid4(),
                 name=basic_info.get('name', ''),
                 email=basic_info.get('email', ''),
@@ -583,24 +654,27 @@ async def create_user_from_onboarding(onboarding_data: dict) -> str:
                 }
             )
 
-            test_verify = verify_password(raw_password, hashed_password)
-
-            print(f"👤 Created user object with period data:")
-            print(f"  user.has_periods: {new_user.has_periods}")
-            print(f"  user.last_period_date: {new_user.last_period_date}")
-            print(f"  user.cycle_length: {new_user.cycle_length}")
-
-            session.add(new_user)
+            # Existence check and insert in one round trip; a duplicate email
+            # inserts nothing and returns no id
+            result = await session.execute(
+                pg_insert(User)
+                .values(**user_values)
+                .on_conflict_do_nothing(index_elements=[User.email])
+                .returning(User.id)
+            )
+            user_id = result.scalar_one_or_none()
             await session.commit()
-            await session.refresh(new_user)
             
-            print(f"✅ User created successfully with ID: {new_user.id}")
-            return str(new_user.id)
+            if user_id is None:
+                logger.debug("Signup rejected: email already registered")
+                return None
             
-        except Exception as e:
+            logger.debug("User created with ID %s", user_id)
+            return str(user_id)
+            
+        except Exception:
             await session.rollback()
-            print(f"Error creating user: {e}")
-            traceback.print_exc()
+            logger.exception("Error creating user")
             raise
 
 async def get_user_by_email(email: str):
@@ -615,6 +689,21 @@ async def get_user_by_email(email: str):
             print(f"Error fetching user by email: {e}")
             return None
 
+async def get_login_user(email: str) -> Optional[LoginUser]:
+    """
+    Get the login record for an email. Always read from the database: a
+    per-process copy of the hash would outlive a password change made through
+    another worker.
+    """
+    async with SessionLocal() as session:
+        result = await session.execute(
+            select(User.id, User.email, User.password_hash, User.password)
+            .where(User.email == email)
+        )
+        row = result.first()
+    
+    return LoginUser(row.id, row.email, row.password_hash or row.password) if row else None
+
 async def get_user_by_id(user_id: str):
     """Get user by ID"""
     async with SessionLocal() as session:
@@ -766,32 +855,119 @@ async def append_to_user_conversation(user_id: str, user_message: str, agent_mes
         traceback.print_exc()
         raise
 
+def _format_datetime(dt):
+    if dt is None:
+        return None
+    if isinstance(dt, datetime):
+        return dt.isoformat()
+    return str(dt)
+
+def _to_user_uuid(user_id):
+    """
+    Convert a user id to a UUID. Short strings like "guest" map to a
+    deterministic uuid5; returns None for malformed ids.
+    """
+    try:
+        if isinstance(user_id, str) and len(user_id) < 32:
+            return uuid.uuid5(uuid.NAMESPACE_DNS, user_id)
+        if isinstance(user_id, str):
+            return uuid.UUID(user_id)
+        return user_id
+    except ValueError:
+        return None
+
+def _user_to_profile(user) -> dict:
+    """Build the comprehensive profile dict for a User row"""
+    return {
+        "id": str(user.id),
+        "name": user.name,
+        "email": user.email,
+        
+        # Physical stats
+        "gender": user.gender,
+        "age": user.age,
+        "height": user.height,
+        "weight": user.weight,
+        "activityLevel": user.activity_level,
+        
+        # Health metrics
+        "bmi": user.bmi,
+        "bmr": user.bmr,
+        "tdee": user.tdee,
+        
+        # Reproductive health fields
+        "hasPeriods": user.has_periods,
+        "has_periods": user.has_periods,
+        "lastPeriodDate": _format_datetime(user.last_period_date),
+        "last_period_date": _format_datetime(user.last_period_date),
+        "cycleLength": user.cycle_length,
+        "cycle_length": user.cycle_length,
+        "periodLength": user.period_length,
+        "period_length": user.period_length,
+        "cycleLengthRegular": user.cycle_length_regular,
+        "cycle_length_regular": user.cycle_length_regular,
+        "pregnancyStatus": user.pregnancy_status,
+        "pregnancy_status": user.pregnancy_status,
+        "periodTrackingPreference": user.period_tracking_preference,
+        "period_tracking_preference": user.period_tracking_preference,
+
+        # Goals
+        "primaryGoal": user.primary_goal,
+        "fitnessGoal": user.fitness_goal or user.primary_goal,
+        "weightGoal": user.weight_goal,
+        "targetWeight": user.target_weight,
+        "goalTimeline": user.goal_timeline,
+        
+        # Sleep
+        "sleepHours": user.sleep_hours,
+        "bedtime": user.bedtime,
+        "wakeupTime": user.wakeup_time,
+        "sleepIssues": user.sleep_issues or [],
+        
+        # Nutrition
+        "dietaryPreferences": user.dietary_preferences or [],
+        "waterIntake": user.water_intake,
+        "medicalConditions": user.medical_conditions or [],
+        "otherMedicalCondition": user.other_medical_condition,
+        
+        # Exercise
+        "preferredWorkouts": user.preferred_workouts or [],
+        "workoutFrequency": user.workout_frequency,
+        "workoutDuration": user.workout_duration,
+        "workoutLocation": user.workout_location,
+        "availableEquipment": user.available_equipment or [],
+        "fitnessLevel": user.fitness_level,
+        "hasTrainer": user.has_trainer,
+        
+        # Web frontend compatibility
+        "healthMetrics": {
+            "bmr": float(user.bmr or 0),
+            "tdee": float(user.tdee or 0),
+            "bmi": float(user.bmi or 0)
+        },
+        "physicalStats": {
+            "height": float(user.height or 0),
+            "weight": float(user.weight or 0),
+            "age": int(user.age or 0),
+            "gender": user.gender or "male",
+            "activityLevel": user.activity_level or "moderate"
+        },
+        "preferences": user.preferences or {}
+    }
+
 async def get_user_profile(user_id: str):
     """Get complete user profile including physical stats and preferences."""
     print(f"Fetching profile for user ID: {user_id}")
     
     # Convert string user_id to UUID
-    try:
-        if isinstance(user_id, str) and len(user_id) < 32:
-            # For short strings like "guest", use deterministic UUID generation
-            user_id_uuid = uuid.uuid5(uuid.NAMESPACE_DNS, user_id)
-            print(f"Converting '{user_id}' to UUID: {user_id_uuid}")
-        elif isinstance(user_id, str):
-            # For strings that might already be UUIDs
-            user_id_uuid = uuid.UUID(user_id)
-        else:
-            # If it's already a UUID object
-            user_id_uuid = user_id
-    except ValueError:
+    user_id_uuid = _to_user_uuid(user_id)
+    if user_id_uuid is None:
         # Handle invalid UUID format
         print(f"Invalid UUID format for user_id: {user_id}")
         return {}
     
     async with SessionLocal() as session:
         try:
-            if isinstance(user_id, str):
-                user_id = uuid.UUID(user_id)
-
             result = await session.execute(
                 select(User).where(User.id == user_id_uuid)
             )
@@ -801,90 +977,7 @@ async def get_user_profile(user_id: str):
                 print(f"No user found with ID: {user_id} (UUID: {user_id_uuid})")
                 return {}
             
-            def format_datetime(dt):
-                if dt is None:
-                    return None
-                if isinstance(dt, datetime):
-                    return dt.isoformat()
-                return str(dt)
-
-            # Build comprehensive user data object
-            user_data = {
-                "id": str(user.id),
-                "name": user.name,
-                "email": user.email,
-                
-                # Physical stats
-                "gender": user.gender,
-                "age": user.age,
-                "height": user.height,
-                "weight": user.weight,
-                "activityLevel": user.activity_level,
-                
-                # Health metrics
-                "bmi": user.bmi,
-                "bmr": user.bmr,
-                "tdee": user.tdee,
-                
-                # Reproductive health fields
-                "hasPeriods": user.has_periods,
-                "has_periods": user.has_periods,
-                "lastPeriodDate": format_datetime(user.last_period_date),
-                "last_period_date": format_datetime(user.last_period_date),
-                "cycleLength": user.cycle_length,
-                "cycle_length": user.cycle_length,
-                "periodLength": user.period_length,
-                "period_length": user.period_length,
-                "cycleLengthRegular": user.cycle_length_regular,
-                "cycle_length_regular": user.cycle_length_regular,
-                "pregnancyStatus": user.pregnancy_status,
-                "pregnancy_status": user.pregnancy_status,
-                "periodTrackingPreference": user.period_tracking_preference,
-                "period_tracking_preference": user.period_tracking_preference,
-
-                # Goals
-                "primaryGoal": user.primary_goal,
-                "fitnessGoal": user.fitness_goal or user.primary_goal,
-                "weightGoal": user.weight_goal,
-                "targetWeight": user.target_weight,
-                "goalTimeline": user.goal_timeline,
-                
-                # Sleep
-                "sleepHours": user.sleep_hours,
-                "bedtime": user.bedtime,
-                "wakeupTime": user.wakeup_time,
-                "sleepIssues": user.sleep_issues or [],
-                
-                # Nutrition
-                "dietaryPreferences": user.dietary_preferences or [],
-                "waterIntake": user.water_intake,
-                "medicalConditions": user.medical_conditions or [],
-                "otherMedicalCondition": user.other_medical_condition,
-                
-                # Exercise
-                "preferredWorkouts": user.preferred_workouts or [],
-                "workoutFrequency": user.workout_frequency,
-                "workoutDuration": user.workout_duration,
-                "workoutLocation": user.workout_location,
-                "availableEquipment": user.available_equipment or [],
-                "fitnessLevel": user.fitness_level,
-                "hasTrainer": user.has_trainer,
-                
-                # Web frontend compatibility
-                "healthMetrics": {
-                    "bmr": float(user.bmr or 0),
-                    "tdee": float(user.tdee or 0),
-                    "bmi": float(user.bmi or 0)
-                },
-                "physicalStats": {
-                    "height": float(user.height or 0),
-                    "weight": float(user.weight or 0),
-                    "age": int(user.age or 0),
-                    "gender": user.gender or "male",
-                    "activityLevel": user.activity_level or "moderate"
-                },
-                "preferences": user.preferences or {}
-            }
+            user_data = _user_to_profile(user)
             
             print(f"Processed user data: {user_data}")
             return user_data
@@ -893,6 +986,26 @@ async def get_user_profile(user_id: str):
             traceback.print_exc()
             return {}
 
+async def get_user_profiles(user_ids) -> dict:
+    """
+    Get profiles for several users in one query. Returns a dict keyed by the
+    ids as passed in; unknown or malformed ids are left out.
+    """
+    uuid_to_id = {}
+    for user_id in user_ids:
+        user_id_uuid = _to_user_uuid(user_id)
+        if user_id_uuid is not None:
+            uuid_to_id[user_id_uuid] = user_id
+    
+    if not uuid_to_id:
+        return {}
+    
+    async with SessionLocal() as session:
+        result = await session.execute(
+            select(User).where(User.id.in_(list(uuid_to_id)))
+        )
+        return {uuid_to_id[user.id]: _user_to_profile(user) for user in result.scalars()}
+
 async def init_database():
     """
     Initialize the database tables and create default users if needed.
@@ -902,6 +1015,13 @@ async def init_database():
         # Create tables
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            for statement in STARTUP_INDEXES:
+                # Savepoint per index so one failure doesn't undo create_all
+                try:
+                    async with conn.begin_nested():
+                        await conn.execute(text(statement))
+                except Exception as e:
+                    print(f"⚠️ Skipping startup index: {e}")
         
         # Create default users
         async with SessionLocal() as session:
@@ -956,6 +1076,9 @@ async def init_database():
     except Exception as e:
         print(f"Error during database initialization: {e}")
         traceback.print_exc()
+    
+    # Outside the try above: a missing arbiter index must stop startup
+    await check_upsert_indexes()
 
 # Keep existing user notes functions unchanged...
 async def get_user_notes(user_id: str):
@@ -3,41 +3,61 @@
 Exercise logging and tracking API endpoints
 """
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Optional, List
-from datetime import datetime, date, timedelta
-from database import SessionLocal, User
-from sqlalchemy import select, text
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, List, Literal
+from datetime import datetime, timedelta, timezone
+from database import SessionLocal, engine
+from cache import TTLCache
+from sqlalchemy import text
 import uuid
-import traceback
+import asyncio
+import logging
+import orjson
+from itertools import product
+from types import MappingProxyType
+
+logger = logging.getLogger(__name__)
 
 # Initialize router
-exercise_router = APIRouter(prefix="/api/health/exercise", tags=["exercise"])
+exercise_router = APIRouter(
+    prefix="/api/health/exercise",
+    tags=["exercise"],
+    default_response_class=ORJSONResponse
+)
+
+# Accepted request values; intensity keys must match _MET_VALUES
+ExerciseType = Literal["cardio", "strength", "flexibility", "sports", "other"]
+Intensity = Literal["low", "moderate", "high"]
 
-# Pydantic models
+# Largest value a Postgres INTEGER column accepts
+_PG_INT_MAX = 2_147_483_647
+
+# Pydantic models. Lengths and ranges mirror the exercise_logs columns so a bad
+# value is a 422 here rather than a failed insert in a shared batch
 class ExerciseLogRequest(BaseModel):
-    user_id: str
-    exercise_name: str
-    exercise_type: str  # cardio, strength, flexibility, sports, etc.
-    duration_minutes: int
+    user_id: uuid.UUID
+    exercise_name: str = Field(max_length=100)
+    exercise_type: ExerciseType
+    duration_minutes: int = Field(ge=0, le=_PG_INT_MAX)
     calories_burned: Optional[float] = None
     distance_km: Optional[float] = None
-    sets: Optional[int] = None
-    reps: Optional[int] = None
+    sets: Optional[int] = Field(default=None, ge=0, le=_PG_INT_MAX)
+    reps: Optional[int] = Field(default=None, ge=0, le=_PG_INT_MAX)
     weight_kg: Optional[float] = None
-    intensity: Optional[str] = "moderate"  # low, moderate, high
-    notes: Optional[str] = None
-    exercise_date: Optional[str] = None
+    intensity: Intensity = "moderate"
+    notes: Optional[str] = Field(default=None, max_length=500)
+    exercise_date: Optional[datetime] = None
 
 class ExerciseUpdateRequest(BaseModel):
-    duration_minutes: Optional[int] = None
+    duration_minutes: Optional[int] = Field(default=None, ge=0, le=_PG_INT_MAX)
     calories_burned: Optional[float] = None
     distance_km: Optional[float] = None
-    sets: Optional[int] = None
-    reps: Optional[int] = None
+    sets: Optional[int] = Field(default=None, ge=0, le=_PG_INT_MAX)
+    reps: Optional[int] = Field(default=None, ge=0, le=_PG_INT_MAX)
     weight_kg: Optional[float] = None
-    intensity: Optional[str] = None
-    notes: Optional[str] = None
+    intensity: Optional[Intensity] = None
+    notes: Optional[str] = Field(default=None, max_length=500)
 
 class ExerciseStatsResponse(BaseModel):
     total_workouts: int
@@ -50,92 +70,343 @@ class ExerciseStatsResponse(BaseModel):
     this_week_workouts: int
     this_month_workouts: int
 
-@exercise_router.post("/log")
-async def log_exercise(request: ExerciseLogRequest):
+class ExerciseLogOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
+    id: Optional[uuid.UUID] = None
+    exercise_name: str
+    exercise_type: str
+    duration_minutes: int
+    calories_burned: Optional[float] = None
+    distance_km: Optional[float] = None
+    sets: Optional[int] = None
+    reps: Optional[int] = None
+    weight_kg: Optional[float] = None
+    intensity: Optional[str] = None
+    notes: Optional[str] = None
+    exercise_date: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+
+class ExerciseLogsResponse(BaseModel):
+    success: bool
+    logs: List[ExerciseLogOut]
+    count: int
+
+class ExerciseHistoryResponse(BaseModel):
+    success: bool
+    exercises: List[ExerciseLogOut]
+    count: int
+
+# Per-user stats responses keyed by str(uuid), dropped whenever that user's
+# logs change
+_stats_cache = TTLCache(maxsize=10_000, ttl=60)
+
+# MET values used to estimate calories burned by intensity
+_MET_VALUES = MappingProxyType({
+    "low": 3.0,
+    "moderate": 5.0,
+    "high": 8.0
+})
+
+# Batched insert: rows arrive as one JSON array and are joined against users,
+# so rows for unknown users are simply not inserted (and not returned).
+# Calories fall back to MET * body weight when the client did not send them.
+# This runs directly on the asyncpg connection, whose statement cache keeps
+# it prepared server-side, so it is a plain string with a positional param.
+_INSERT_LOGS_SQL = """
+    INSERT INTO exercise_logs (
+        id, user_id, exercise_name, exercise_type, 
+        duration_minutes, calories_burned, distance_km,
+        sets, reps, weight_kg, intensity, notes, exercise_date
+    )
+    SELECT
+        r.id, r.user_id, r.exercise_name, r.exercise_type,
+        r.duration_minutes,
+        COALESCE(r.calories_burned, r.met * COALESCE(u.weight, 70) * r.duration_minutes / 60.0),
+        r.distance_km, r.sets, r.reps, r.weight_kg, r.intensity, r.notes, r.exercise_date
+    FROM jsonb_to_recordset(CAST($1 AS JSONB)) AS r(
+        id UUID, user_id UUID, exercise_name VARCHAR, exercise_type VARCHAR,
+        duration_minutes INTEGER, calories_burned FLOAT, met FLOAT, distance_km FLOAT,
+        sets INTEGER, reps INTEGER, weight_kg FLOAT, intensity VARCHAR, notes VARCHAR,
+        exercise_date TIMESTAMPTZ
+    )
+    JOIN users u ON u.id = r.user_id
+    RETURNING id, calories_burned
+"""
+
+# SQL statements are built once at import time and reused by every request
+
+# All exercise stats in one round-trip: totals and windowed counts via
+# FILTER aggregates, favourite type and streaks via CTEs. Streaks are
+# gaps-and-islands over distinct workout days; the current streak is the
+# island ending today or yesterday.
+_STATS_SQL = text("""
+    WITH fav AS (
+        SELECT exercise_type
+        FROM exercise_logs
+        WHERE user_id = :user_id
+        GROUP BY exercise_type
+        ORDER BY COUNT(*) DESC
+        LIMIT 1
+    ),
+    days AS (
+        SELECT DISTINCT exercise_date::date as workout_day
+        FROM exercise_logs
+        WHERE user_id = :user_id
+    ),
+    islands AS (
+        SELECT 
+            workout_day,
+            workout_day - (ROW_NUMBER() OVER (ORDER BY workout_day))::int as island
+        FROM days
+    ),
+    streaks AS (
+        SELECT COUNT(*) as streak_length, MAX(workout_day) as last_day
+        FROM islands
+        GROUP BY island
+    )
+    SELECT 
+        COUNT(*) as total_workouts,
+        COALESCE(SUM(duration_minutes), 0) as total_duration,
+        COALESCE(SUM(calories_burned), 0) as total_calories,
+        COALESCE(AVG(duration_minutes), 0) as avg_duration,
+        COUNT(*) FILTER (WHERE exercise_date >= :week_start) as week_count,
+        COUNT(*) FILTER (WHERE exercise_date >= :month_start) as month_count,
+        (SELECT exercise_type FROM fav) as favorite_type,
+        (SELECT COALESCE(MAX(streak_length) FILTER (WHERE last_day >= CURRENT_DATE - 1), 0) FROM streaks) as current_streak,
+        (SELECT COALESCE(MAX(streak_length), 0) FROM streaks) as longest_streak
+    FROM exercise_logs
+    WHERE user_id = :user_id
+""")
+
+_DELETE_USER_LOG_SQL = text("""
+    DELETE FROM exercise_logs
+    WHERE id = :exercise_id AND user_id = :user_id
+    RETURNING id
+""")
+
+# Optional bounds are NULL-tolerant so one statement covers every history filter
+_HISTORY_SQL = text("""
+    SELECT * FROM exercise_logs 
+    WHERE user_id = :user_id 
+    AND (CAST(:start_date AS TIMESTAMPTZ) IS NULL OR exercise_date >= :start_date)
+    AND (CAST(:end_date AS TIMESTAMPTZ) IS NULL OR exercise_date <= :end_date)
+    ORDER BY exercise_date DESC
+    LIMIT :limit
+""")
+
+_DELETE_LOG_SQL = text("DELETE FROM exercise_logs WHERE id = :id RETURNING user_id")
+
+_WEEKLY_DAILY_SQL = text("""
+    SELECT 
+        COUNT(*) as total_workouts,
+        SUM(duration_minutes) as total_minutes,
+        SUM(calories_burned) as total_calories,
+        AVG(duration_minutes) as avg_duration,
+        DATE(exercise_date) as workout_date
+    FROM exercise_logs
+    WHERE user_id = :user_id 
+    AND exercise_date >= :start_date
+    GROUP BY DATE(exercise_date)
+    ORDER BY workout_date DESC
+""")
+
+_WEEKLY_TYPES_SQL = text("""
+    SELECT 
+        exercise_type,
+        COUNT(*) as count,
+        SUM(duration_minutes) as total_minutes
+    FROM exercise_logs
+    WHERE user_id = :user_id 
+    AND exercise_date >= :start_date
+    GROUP BY exercise_type
+""")
+
+# get_exercise_logs filters are optional, so every combination of
+# (start_date, end_date, exercise_type) is pre-built at import time
+def _build_logs_query(has_start: bool, has_end: bool, has_type: bool):
+    """Build the logs SELECT for one combination of optional filters"""
+    query_parts = ["SELECT * FROM exercise_logs WHERE user_id = :user_id"]
+    if has_start:
+        query_parts.append("AND exercise_date >= :start_date")
+    if has_end:
+        query_parts.append("AND exercise_date <= :end_date")
+    if has_type:
+        query_parts.append("AND exercise_type = :exercise_type")
+    query_parts.append("ORDER BY exercise_date DESC")
+    query_parts.append("LIMIT :limit")
+    return text(" ".join(query_parts))
+
+_LOGS_QUERIES = {
+    key: _build_logs_query(*key)
+    for key in product((False, True), repeat=3)
+}
+
+# Batched exercise log writer. Inserts arriving within a short window share a
+# single executemany and commit instead of paying one WAL flush each.
+_BATCH_MAX_SIZE = 64
+_BATCH_MAX_WAIT = 0.005  # seconds
+_insert_queue = asyncio.Queue()
+# Strong reference to the writer; the event loop only keeps weak ones
+_writer_task: Optional[asyncio.Task] = None
+
+async def _insert_rows(batch: list) -> dict:
+    """Insert queued rows in one statement; returns {id: stored calories}"""
+    rows = orjson.dumps([params for params, _ in batch]).decode()
+    async with engine.connect() as conn:
+        raw_conn = await conn.get_raw_connection()
+        # A single statement, so asyncpg commits it implicitly
+        records = await raw_conn.driver_connection.fetch(_INSERT_LOGS_SQL, rows)
+    return {record["id"]: record["calories_burned"] for record in records}
+
+async def _write_batch(batch: list):
     """
-    Log a new exercise session
+    Write one batch and resolve its futures. If the batch insert fails, its
+    rows are retried one at a time so only the offending request gets the error.
     """
     try:
-        print(f"📝 Logging exercise for user {request.user_id}: {request.exercise_name}")
-        
-        async with SessionLocal() as session:
-            # Verify user exists
-            user_result = await session.execute(
-                select(User).where(User.id == request.user_id)
-            )
-            user = user_result.scalar_one_or_none()
-            
-            if not user:
-                raise HTTPException(status_code=404, detail="User not found")
-            
-            # Calculate calories if not provided
-            if request.calories_burned is None:
-                # Basic calorie calculation based on activity and user weight
-                weight_kg = user.weight or 70
-                met_values = {
-                    "low": 3.0,
-                    "moderate": 5.0,
-                    "high": 8.0
-                }
-                met = met_values.get(request.intensity, 5.0)
-                request.calories_burned = (met * weight_kg * request.duration_minutes) / 60
-            
-            # Parse exercise date
-            if request.exercise_date:
-                exercise_date = datetime.fromisoformat(request.exercise_date.replace('Z', '+00:00'))
+        results = [(batch, await _insert_rows(batch))]
+    except Exception as e:
+        if len(batch) == 1:
+            results = [(batch, e)]
+        else:
+            logger.warning("Exercise batch of %d failed, retrying rows singly: %s", len(batch), e)
+            results = []
+            for item in batch:
+                try:
+                    results.append(([item], await _insert_rows([item])))
+                except Exception as row_error:
+                    results.append(([item], row_error))
+    
+    for items, outcome in results:
+        for params, future in items:
+            if future.done():
+                continue
+            if isinstance(outcome, Exception):
+                future.set_exception(outcome)
             else:
-                exercise_date = datetime.now()
-            
-            # Create exercise log entry
-            exercise_id = str(uuid.uuid4())
-            
-            await session.execute(text("""
-                INSERT INTO exercise_logs (
-                    id, user_id, exercise_name, exercise_type, 
-                    duration_minutes, calories_burned, distance_km,
-                    sets, reps, weight_kg, intensity, notes, exercise_date
-                ) VALUES (
-                    :id, :user_id, :exercise_name, :exercise_type,
-                    :duration_minutes, :calories_burned, :distance_km,
-                    :sets, :reps, :weight_kg, :intensity, :notes, :exercise_date
-                )
-            """), {
-                "id": exercise_id,
-                "user_id": request.user_id,
-                "exercise_name": request.exercise_name,
-                "exercise_type": request.exercise_type,
-                "duration_minutes": request.duration_minutes,
-                "calories_burned": request.calories_burned,
-                "distance_km": request.distance_km,
-                "sets": request.sets,
-                "reps": request.reps,
-                "weight_kg": request.weight_kg,
-                "intensity": request.intensity,
-                "notes": request.notes,
-                "exercise_date": exercise_date
-            })
-            
-            await session.commit()
-            
-            return {
-                "success": True,
-                "exercise_id": exercise_id,
-                "message": "Exercise logged successfully",
-                "calories_burned": request.calories_burned
-            }
-            
-    except HTTPException:
+                # Rows missing from RETURNING belonged to unknown users
+                future.set_result(outcome.get(params["id"]))
+
+def _fail_pending(batch: list):
+    """Fail the in-flight batch and everything still queued so no caller hangs"""
+    error = RuntimeError("Exercise writer stopped before the log was saved")
+    pending = list(batch)
+    while not _insert_queue.empty():
+        pending.append(_insert_queue.get_nowait())
+        _insert_queue.task_done()
+    for _, future in pending:
+        if not future.done():
+            future.set_exception(error)
+
+async def _exercise_writer():
+    """Drain queued exercise inserts and write them in batches."""
+    loop = asyncio.get_running_loop()
+    batch = []
+    
+    try:
+        while True:
+            batch = [await _insert_queue.get()]
+            deadline = loop.time() + _BATCH_MAX_WAIT
+            
+            # Collect whatever else arrives before the window closes
+            while len(batch) < _BATCH_MAX_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(_insert_queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            await _write_batch(batch)
+            
+            for _ in batch:
+                _insert_queue.task_done()
+            batch = []
+    except asyncio.CancelledError:
+        _fail_pending(batch)
         raise
-    except Exception as e:
-        print(f"❌ Error logging exercise: {e}")
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
 
-@exercise_router.get("/logs/{user_id}")
+def start_exercise_writer():
+    """Start the batched exercise writer if not already running."""
+    global _writer_task
+    if _writer_task is None or _writer_task.done():
+        _writer_task = asyncio.create_task(_exercise_writer())
+
+async def stop_exercise_writer():
+    """Cancel the writer; queued and in-flight logs fail instead of hanging."""
+    global _writer_task
+    task, _writer_task = _writer_task, None
+    if task is not None and not task.done():
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+async def _queue_exercise_insert(params: dict) -> Optional[float]:
+    """
+    Queue one exercise_logs insert and wait until its batch is committed.
+    Returns the stored calories_burned, or None if the user does not exist.
+    """
+    start_exercise_writer()
+    future = asyncio.get_running_loop().create_future()
+    await _insert_queue.put((params, future))
+    return await future
+
+@exercise_router.post("/log")
+async def log_exercise(request: ExerciseLogRequest):
+    """
+    Log a new exercise session
+    """
+    logger.debug("Logging exercise user=%s name=%s", request.user_id, request.exercise_name)
+    
+    # Exercise date is already parsed by the request model
+    exercise_date = request.exercise_date or datetime.now(timezone.utc)
+    
+    # Create exercise log entry; the writer resolves the user and
+    # fills in calories from their weight when none were provided
+    exercise_uuid = uuid.uuid4()
+    
+    calories_burned = await _queue_exercise_insert({
+        "id": exercise_uuid,
+        "user_id": request.user_id,
+        "exercise_name": request.exercise_name,
+        "exercise_type": request.exercise_type,
+        "duration_minutes": request.duration_minutes,
+        "calories_burned": request.calories_burned,
+        "met": _MET_VALUES[request.intensity],
+        "distance_km": request.distance_km,
+        "sets": request.sets,
+        "reps": request.reps,
+        "weight_kg": request.weight_kg,
+        "intensity": request.intensity,
+        "notes": request.notes,
+        "exercise_date": exercise_date
+    })
+    
+    if calories_burned is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    _stats_cache.pop(str(request.user_id), None)
+    
+    return {
+        "success": True,
+        "exercise_id": str(exercise_uuid),
+        "message": "Exercise logged successfully",
+        "calories_burned": calories_burned
+    }
+
+@exercise_router.get(
+    "/logs/{user_id}",
+    response_model=ExerciseLogsResponse,
+    response_model_exclude_none=True
+)
 async def get_exercise_logs(
     user_id: str,
-    start_date: Optional[str] = None,
-    end_date: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
     exercise_type: Optional[str] = None,
     limit: int = 50
 ):
@@ -144,71 +415,23 @@ async def get_exercise_logs(
     """
     try:
         async with SessionLocal() as session:
-            # First, verify the exercise_logs table exists
-            await session.execute(text("""
-                CREATE TABLE IF NOT EXISTS exercise_logs (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                    user_id UUID NOT NULL,
-                    exercise_name VARCHAR(100) NOT NULL,
-                    exercise_type VARCHAR(50) NOT NULL,
-                    duration_minutes INTEGER NOT NULL,
-                    calories_burned FLOAT,
-                    distance_km FLOAT,
-                    sets INTEGER,
-                    reps INTEGER,
-                    weight_kg FLOAT,
-                    intensity VARCHAR(20) DEFAULT 'moderate',
-                    notes VARCHAR(500),
-                    exercise_date TIMESTAMP WITH TIME ZONE NOT NULL,
-                    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-                )
-            """))
-            await session.commit()
-            
-            # Build the query with parameters
-            query_parts = ["SELECT * FROM exercise_logs WHERE user_id = :user_id"]
-            params = {"user_id": user_id}
+            # Pick the cached query matching the supplied filters
+            params = {"user_id": user_id, "limit": limit}
             
             if start_date:
-                query_parts.append("AND exercise_date >= :start_date")
-                params["start_date"] = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
+                params["start_date"] = start_date
             
             if end_date:
-                query_parts.append("AND exercise_date <= :end_date")
-                params["end_date"] = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+                params["end_date"] = end_date
             
             if exercise_type:
-                query_parts.append("AND exercise_type = :exercise_type")
                 params["exercise_type"] = exercise_type
             
-            query_parts.append("ORDER BY exercise_date DESC")
-            query_parts.append("LIMIT :limit")
-            params["limit"] = limit
-            
-            query = text(" ".join(query_parts))
-            result = await session.execute(query, params)
-            logs = result.fetchall()
-            
-            # Convert Row objects to dictionaries properly
-            exercise_logs = []
-            for log in logs:
-                # Access row data by column name
-                log_dict = {
-                    "id": str(log.id) if log.id else None,
-                    "exercise_name": log.exercise_name,
-                    "exercise_type": log.exercise_type,
-                    "duration_minutes": log.duration_minutes,
-                    "calories_burned": float(log.calories_burned) if log.calories_burned else None,
-                    "distance_km": float(log.distance_km) if log.distance_km else None,
-                    "sets": log.sets,
-                    "reps": log.reps,
-                    "weight_kg": float(log.weight_kg) if log.weight_kg else None,
-                    "intensity": log.intensity,
-                    "notes": log.notes,
-                    "exercise_date": log.exercise_date.isoformat() if log.exercise_date else None,
-                    "created_at": log.created_at.isoformat() if log.created_at else None
-                }
-                exercise_logs.append(log_dict)
+            query = _LOGS_QUERIES[(bool(start_date), bool(end_date), bool(exercise_type))]
+            exercise_logs = [
+                ExerciseLogOut.model_validate(log)
+                async for log in (await session.stream(query, params)).mappings()
+            ]
             
             return {
                 "success": True,
@@ -217,122 +440,63 @@ async def get_exercise_logs(
             }
             
     except Exception as e:
-        print(f"❌ Error fetching exercise logs: {e}")
-        traceback.print_exc()
+        logger.exception("Error fetching exercise logs")
         raise HTTPException(status_code=500, detail=str(e))
 
 @exercise_router.get("/stats/{user_id}")
-async def get_exercise_stats(user_id: str):
+async def get_exercise_stats(user_id: uuid.UUID):
     """
     Get exercise statistics for a user
     """
+    # Keyed by the canonical string form, which is what writers pop
+    cache_key = str(user_id)
+    cached = _stats_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
         async with SessionLocal() as session:
-            # Ensure table exists
-            await session.execute(text("""
-                CREATE TABLE IF NOT EXISTS exercise_logs (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                    user_id UUID NOT NULL,
-                    exercise_name VARCHAR(100) NOT NULL,
-                    exercise_type VARCHAR(50) NOT NULL,
-                    duration_minutes INTEGER NOT NULL,
-                    calories_burned FLOAT,
-                    distance_km FLOAT,
-                    sets INTEGER,
-                    reps INTEGER,
-                    weight_kg FLOAT,
-                    intensity VARCHAR(20) DEFAULT 'moderate',
-                    notes VARCHAR(500),
-                    exercise_date TIMESTAMP WITH TIME ZONE NOT NULL,
-                    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-                )
-            """))
-            await session.commit()
-            
-            # Get total stats
-            stats_result = await session.execute(text("""
-                SELECT 
-                    COUNT(*) as total_workouts,
-                    COALESCE(SUM(duration_minutes), 0) as total_duration,
-                    COALESCE(SUM(calories_burned), 0) as total_calories,
-                    COALESCE(AVG(duration_minutes), 0) as avg_duration
-                FROM exercise_logs
-                WHERE user_id = :user_id
-            """), {"user_id": user_id})
-            
-            stats = stats_result.fetchone()
-            
-            # Get favorite exercise type
-            type_result = await session.execute(text("""
-                SELECT exercise_type, COUNT(*) as count
-                FROM exercise_logs
-                WHERE user_id = :user_id
-                GROUP BY exercise_type
-                ORDER BY count DESC
-                LIMIT 1
-            """), {"user_id": user_id})
-            
-            favorite_type = type_result.fetchone()
-            
-            # Get this week's workouts
-            week_result = await session.execute(text("""
-                SELECT COUNT(*) as week_count
-                FROM exercise_logs
-                WHERE user_id = :user_id
-                AND exercise_date >= :week_start
-            """), {
-                "user_id": user_id,
-                "week_start": datetime.now() - timedelta(days=7)
-            })
-            
-            week_stats = week_result.fetchone()
-            
-            # Get this month's workouts
-            month_result = await session.execute(text("""
-                SELECT COUNT(*) as month_count
-                FROM exercise_logs
-                WHERE user_id = :user_id
-                AND exercise_date >= :month_start
-            """), {
+            now = datetime.now()
+            stats_result = await session.execute(_STATS_SQL, {
                 "user_id": user_id,
-                "month_start": datetime.now() - timedelta(days=30)
+                "week_start": now - timedelta(days=7),
+                "month_start": now - timedelta(days=30)
             })
             
-            month_stats = month_result.fetchone()
+            stats = stats_result.fetchone()
             
-            return {
+            response = {
                 "success": True,
                 "stats": {
                     "total_workouts": int(stats.total_workouts) if stats else 0,
                     "total_duration_minutes": int(stats.total_duration) if stats else 0,
                     "total_calories_burned": float(stats.total_calories) if stats else 0.0,
                     "average_duration": float(stats.avg_duration) if stats else 0.0,
-                    "favorite_exercise_type": favorite_type.exercise_type if favorite_type else "None",
-                    "current_streak": 0,  # Simplified for now
-                    "longest_streak": 0,  # Simplified for now
-                    "this_week_workouts": int(week_stats.week_count) if week_stats else 0,
-                    "this_month_workouts": int(month_stats.month_count) if month_stats else 0
+                    "favorite_exercise_type": stats.favorite_type if stats and stats.favorite_type else "None",
+                    "current_streak": int(stats.current_streak) if stats else 0,
+                    "longest_streak": int(stats.longest_streak) if stats else 0,
+                    "this_week_workouts": int(stats.week_count) if stats else 0,
+                    "this_month_workouts": int(stats.month_count) if stats else 0
                 }
             }
+            _stats_cache[cache_key] = response
+            return response
             
     except Exception as e:
-        print(f"❌ Error fetching exercise stats: {e}")
-        traceback.print_exc()
+        logger.exception("Error fetching exercise stats")
         raise HTTPException(status_code=500, detail=str(e))
 
 @exercise_router.delete("/log/{exercise_id}")
-async def delete_exercise_log(exercise_id: str, user_id: str):
+async def delete_exercise_log(exercise_id: str, user_id: uuid.UUID):
     """
     Delete an exercise log entry
     """
     try:
-        async with SessionLocal() as session:
+        # The transaction commits when the block exits, or rolls back
+        # immediately if nothing matched and we raise
+        async with SessionLocal() as session, session.begin():
             # Verify ownership
-            result = await session.execute(text("""
-                DELETE FROM exercise_logs
-                WHERE id = :exercise_id AND user_id = :user_id
-                RETURNING id
-            """), {
+            result = await session.execute(_DELETE_USER_LOG_SQL, {
                 "exercise_id": exercise_id,
                 "user_id": user_id
             })
@@ -341,135 +505,64 @@ async def delete_exercise_log(exercise_id: str, user_id: str):
             
             if not deleted:
                 raise HTTPException(status_code=404, detail="Exercise log not found")
-            
-            await session.commit()
-            
-            return {
-                "success": True,
-                "message": "Exercise log deleted successfully"
-            }
+        
+        _stats_cache.pop(str(user_id), None)
+        
+        return {
+            "success": True,
+            "message": "Exercise log deleted successfully"
+        }
             
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error deleting exercise log: {e}")
+        logger.exception("Error deleting exercise log")
         raise HTTPException(status_code=500, detail=str(e))
     
-@exercise_router.get("/history/{user_id}")
+@exercise_router.get(
+    "/history/{user_id}",
+    response_model=ExerciseHistoryResponse,
+    response_model_exclude_none=True
+)
 async def get_exercise_history(
     user_id: str,
-    date: Optional[str] = None,
-    start_date: Optional[str] = None,
-    end_date: Optional[str] = None,
+    date: Optional[datetime] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
     limit: int = 20
 ):
     """
     Get exercise history for a user with optional date filtering
     """
     try:
-        print(f"📍 Getting exercise history for user {user_id}, date: {date}")
+        logger.debug("Getting exercise history user=%s date=%s", user_id, date)
         
         async with SessionLocal() as session:
-            # First ensure the table exists
-            await session.execute(text("""
-                CREATE TABLE IF NOT EXISTS exercise_logs (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                    user_id UUID NOT NULL,
-                    exercise_name VARCHAR(100) NOT NULL,
-                    exercise_type VARCHAR(50) NOT NULL,
-                    duration_minutes INTEGER NOT NULL,
-                    calories_burned FLOAT,
-                    distance_km FLOAT,
-                    sets INTEGER,
-                    reps INTEGER,
-                    weight_kg FLOAT,
-                    intensity VARCHAR(20) DEFAULT 'moderate',
-                    notes VARCHAR(500),
-                    exercise_date TIMESTAMP WITH TIME ZONE NOT NULL,
-                    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-                )
-            """))
-            await session.commit()
-            
-            # Build the query
-            query = text("""
-                SELECT * FROM exercise_logs 
-                WHERE user_id = :user_id
-            """)
+            # Resolve the requested window; unset bounds stay None
+            range_start = range_end = None
             
-            params = {"user_id": user_id}
-            
-            # Handle date filtering
             if date:
                 # If a specific date is provided, get exercises for that day
-                target_date = datetime.fromisoformat(date.replace('Z', '+00:00')).date()
-                start_of_day = datetime.combine(target_date, datetime.min.time())
-                end_of_day = start_of_day + timedelta(days=1)
-                
-                query = text("""
-                    SELECT * FROM exercise_logs 
-                    WHERE user_id = :user_id 
-                    AND exercise_date >= :start_date 
-                    AND exercise_date < :end_date
-                    ORDER BY exercise_date DESC
-                    LIMIT :limit
-                """)
-                params.update({
-                    "start_date": start_of_day,
-                    "end_date": end_of_day,
-                    "limit": limit
-                })
+                range_start = datetime.combine(date.date(), datetime.min.time())
+                range_end = range_start + timedelta(days=1, microseconds=-1)
             elif start_date and end_date:
                 # Date range filtering
-                start = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-                end = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-                
-                query = text("""
-                    SELECT * FROM exercise_logs 
-                    WHERE user_id = :user_id 
-                    AND exercise_date >= :start_date 
-                    AND exercise_date <= :end_date
-                    ORDER BY exercise_date DESC
-                    LIMIT :limit
-                """)
-                params.update({
-                    "start_date": start,
-                    "end_date": end,
-                    "limit": limit
-                })
-            else:
-                # No date filter, get recent exercises
-                query = text("""
-                    SELECT * FROM exercise_logs 
-                    WHERE user_id = :user_id 
-                    ORDER BY exercise_date DESC
-                    LIMIT :limit
-                """)
-                params["limit"] = limit
+                range_start = start_date
+                range_end = end_date
             
-            result = await session.execute(query, params)
-            logs = result.fetchall()
-            
-            # Convert to dictionary format
-            exercise_logs = []
-            for log in logs:
-                exercise_logs.append({
-                    "id": str(log.id),
-                    "exercise_name": log.exercise_name,
-                    "exercise_type": log.exercise_type,
-                    "duration_minutes": log.duration_minutes,
-                    "calories_burned": float(log.calories_burned) if log.calories_burned else 0,
-                    "distance_km": float(log.distance_km) if log.distance_km else None,
-                    "sets": log.sets,
-                    "reps": log.reps,
-                    "weight_kg": float(log.weight_kg) if log.weight_kg else None,
-                    "intensity": log.intensity,
-                    "notes": log.notes,
-                    "exercise_date": log.exercise_date.isoformat() if log.exercise_date else None,
-                    "created_at": log.created_at.isoformat() if log.created_at else None
-                })
-            
-            print(f"✅ Found {len(exercise_logs)} exercises")
+            params = {
+                "user_id": user_id,
+                "start_date": range_start,
+                "end_date": range_end,
+                "limit": limit
+            }
+            
+            exercise_logs = [
+                ExerciseLogOut.model_validate(log)
+                async for log in (await session.stream(_HISTORY_SQL, params)).mappings()
+            ]
+            
+            logger.debug("Found %d exercises", len(exercise_logs))
             
             return {
                 "success": True,
@@ -478,8 +571,7 @@ async def get_exercise_history(
             }
             
     except Exception as e:
-        print(f"❌ Error fetching exercise history: {e}")
-        traceback.print_exc()
+        logger.exception("Error fetching exercise history")
         raise HTTPException(status_code=500, detail=str(e))
 
 @exercise_router.delete("/{exercise_id}")
@@ -489,21 +581,21 @@ async def delete_exercise(exercise_id: str):
     """
     try:
         async with SessionLocal() as session:
-            result = await session.execute(
-                text("DELETE FROM exercise_logs WHERE id = :id"),
-                {"id": exercise_id}
-            )
+            result = await session.execute(_DELETE_LOG_SQL, {"id": exercise_id})
+            deleted = result.fetchone()
             await session.commit()
             
-            if result.rowcount == 0:
+            if not deleted:
                 raise HTTPException(status_code=404, detail="Exercise not found")
             
+            _stats_cache.pop(str(deleted.user_id), None)
+            
             return {"success": True, "message": "Exercise deleted successfully"}
             
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error deleting exercise: {e}")
+        logger.exception("Error deleting exercise")
         raise HTTPException(status_code=500, detail=str(e))
 
 @exercise_router.put("/{exercise_id}")
@@ -566,6 +658,8 @@ async def update_exercise(exercise_id: str, request: ExerciseUpdateRequest):
             if not updated_exercise:
                 raise HTTPException(status_code=404, detail="Exercise not found")
             
+            _stats_cache.pop(str(updated_exercise.user_id), None)
+            
             return {
                 "success": True,
                 "message": "Exercise updated successfully",
@@ -573,7 +667,7 @@ async def update_exercise(exercise_id: str, request: ExerciseUpdateRequest):
                     "id": str(updated_exercise.id),
                     "exercise_name": updated_exercise.exercise_name,
                     "duration_minutes": updated_exercise.duration_minutes,
-                    "calories_burned": float(updated_exercise.calories_burned) if updated_exercise.calories_burned else None,
+                    "calories_burned": updated_exercise.calories_burned,
                     "intensity": updated_exercise.intensity
                 }
             }
@@ -581,7 +675,7 @@ async def update_exercise(exercise_id: str, request: ExerciseUpdateRequest):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error updating exercise: {e}")
+        logger.exception("Error updating exercise")
         raise HTTPException(status_code=500, detail=str(e))
 
 @exercise_router.get("/weekly-summary/{user_id}")
@@ -594,19 +688,7 @@ async def get_weekly_summary(user_id: str):
             # Get exercises from the last 7 days
             seven_days_ago = datetime.now() - timedelta(days=7)
             
-            result = await session.execute(text("""
-                SELECT 
-                    COUNT(*) as total_workouts,
-                    SUM(duration_minutes) as total_minutes,
-                    SUM(calories_burned) as total_calories,
-                    AVG(duration_minutes) as avg_duration,
-                    DATE(exercise_date) as workout_date
-                FROM exercise_logs
-                WHERE user_id = :user_id 
-                AND exercise_date >= :start_date
-                GROUP BY DATE(exercise_date)
-                ORDER BY workout_date DESC
-            """), {
+            result = await session.execute(_WEEKLY_DAILY_SQL, {
                 "user_id": user_id,
                 "start_date": seven_days_ago
             })
@@ -614,16 +696,7 @@ async def get_weekly_summary(user_id: str):
             daily_summaries = result.fetchall()
             
             # Get exercise type distribution
-            type_result = await session.execute(text("""
-                SELECT 
-                    exercise_type,
-                    COUNT(*) as count,
-                    SUM(duration_minutes) as total_minutes
-                FROM exercise_logs
-                WHERE user_id = :user_id 
-                AND exercise_date >= :start_date
-                GROUP BY exercise_type
-            """), {
+            type_result = await session.execute(_WEEKLY_TYPES_SQL, {
                 "user_id": user_id,
                 "start_date": seven_days_ago
             })
@@ -640,14 +713,14 @@ async def get_weekly_summary(user_id: str):
                 "summary": {
                     "total_workouts": total_workouts,
                     "total_minutes": total_minutes,
-                    "total_calories": float(total_calories) if total_calories else 0,
-                    "average_duration": float(total_minutes / total_workouts) if total_workouts > 0 else 0,
+                    "total_calories": total_calories,
+                    "average_duration": total_minutes / total_workouts if total_workouts > 0 else 0,
                     "daily_breakdown": [
                         {
-                            "date": day.workout_date.isoformat(),
+                            "date": day.workout_date,
                             "workouts": day.total_workouts,
                             "minutes": day.total_minutes,
-                            "calories": float(day.total_calories) if day.total_calories else 0
+                            "calories": day.total_calories or 0
                         }
                         for day in daily_summaries
                     ],
@@ -663,23 +736,5 @@ async def get_weekly_summary(user_id: str):
             }
             
     except Exception as e:
-        print(f"❌ Error getting weekly summary: {e}")
+        logger.exception("Error getting weekly summary")
         raise HTTPException(status_code=500, detail=str(e))
-
-def calculate_streak(dates: List[date]) -> int:
-    """Calculate current workout streak"""
-    if not dates:
-        return 0
-    
-    streak = 0
-    today = date.today()
-    current_date = today
-    
-    for workout_date in dates:
-        if workout_date == current_date or workout_date == current_date - timedelta(days=1):
-            streak += 1
-            current_date = workout_date
-        else:
-            break
-    
-    return streak
\ No newline at end of file
@@ -1,7 +1,7 @@
 # flutter_models.py - Updated to work with unified backend
-from pydantic import BaseModel, EmailStr
-from typing import List, Optional, Dict, Any
-from datetime import date
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
+from typing import List, Optional, Dict
+from datetime import date, datetime
 
 class HealthUserCreate(BaseModel):
     # Basic info
@@ -36,22 +36,22 @@ class HealthUserCreate(BaseModel):
     sleepHours: Optional[float] = 7
     bedtime: Optional[str] = ""
     wakeupTime: Optional[str] = ""
-    sleepIssues: Optional[List[str]] = []
+    sleepIssues: Optional[List[str]] = Field(default_factory=list)
     
     # Diet
-    dietaryPreferences: Optional[List[str]] = []
+    dietaryPreferences: Optional[List[str]] = Field(default_factory=list)
     waterIntake: Optional[float] = 2.0
     
     # Medical
-    medicalConditions: Optional[List[str]] = []
+    medicalConditions: Optional[List[str]] = Field(default_factory=list)
     otherMedicalCondition: Optional[str] = ""
     
     # Exercise
-    preferredWorkouts: Optional[List[str]] = []
+    preferredWorkouts: Optional[List[str]] = Field(default_factory=list)
     workoutFrequency: Optional[int] = 3
     workoutDuration: Optional[int] = 30
     workoutLocation: Optional[str] = ""
-    availableEquipment: Optional[List[str]] = []
+    availableEquipment: Optional[List[str]] = Field(default_factory=list)
     fitnessLevel: Optional[str] = "Beginner"
     hasTrainer: Optional[bool] = False
     
@@ -69,6 +69,32 @@ class HealthLoginRequest(BaseModel):
     email: EmailStr
     password: str
 
+class HealthUserBatchRequest(BaseModel):
+    ids: List[str] = Field(max_length=200)
+
+class HealthUserBatchResponse(BaseModel):
+    success: bool
+    users: Dict[str, dict] = Field(default_factory=dict)
+
+class SupplementLogRequest(BaseModel):
+    user_id: str = Field(min_length=1)
+    date: date
+    supplement_name: str = Field(min_length=1)
+    taken: bool = False
+    dosage: Optional[str] = None
+    time_taken: Optional[datetime] = None
+
+class SupplementPreference(BaseModel):
+    name: str
+    dosage: Optional[str] = None
+    frequency: Optional[str] = "Daily"
+    preferred_time: Optional[str] = "9:00 AM"
+    notes: Optional[str] = ""
+
+class SupplementPreferencesRequest(BaseModel):
+    user_id: str = Field(min_length=1)
+    supplements: List[SupplementPreference] = Field(default_factory=list)
+
 class WaterIntakeRequest(BaseModel):
     date: date
     glasses: int
@@ -80,20 +106,83 @@ class MealRequest(BaseModel):
     calories: int
     mealTime: str
 
+# Onboarding sections. Fields are typed for validation, but unknown keys are
+# kept (extra="allow") so newer clients can send fields we don't model yet.
+class BasicInfoModel(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    
+    name: Optional[str] = None
+    email: Optional[str] = None
+    password: Optional[str] = None
+    gender: Optional[str] = None
+    age: Optional[int] = None
+    height: Optional[float] = None
+    weight: Optional[float] = None
+    activityLevel: Optional[str] = None
+    bmi: Optional[float] = None
+    bmr: Optional[float] = None
+    tdee: Optional[float] = None
+
 class PeriodCycleData(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    
     hasPeriods: Optional[bool] = None
     lastPeriodDate: Optional[str] = None
     cycleLength: Optional[int] = None
+    periodLength: Optional[int] = None
     cycleLengthRegular: Optional[bool] = None
     pregnancyStatus: Optional[str] = None
     trackingPreference: Optional[str] = None
 
+class WeightGoalModel(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    
+    weightGoal: Optional[str] = None
+    targetWeight: Optional[float] = None
+    timeline: Optional[str] = None
+
+class SleepInfoModel(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    
+    sleepHours: Optional[float] = None
+    bedtime: Optional[str] = None
+    wakeupTime: Optional[str] = None
+    sleepIssues: Optional[List[str]] = None
+
+class DietaryPreferencesModel(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    
+    dietaryPreferences: Optional[List[str]] = None
+    waterIntake: Optional[float] = None
+    medicalConditions: Optional[List[str]] = None
+    otherCondition: Optional[str] = None
+
+class WorkoutPreferencesModel(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    
+    workoutTypes: Optional[List[str]] = None
+    frequency: Optional[int] = None
+    duration: Optional[int] = None
+
+class ExerciseSetupModel(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    
+    workoutLocation: Optional[str] = None
+    equipment: Optional[List[str]] = None
+    fitnessLevel: Optional[str] = None
+    hasTrainer: Optional[bool] = None
+
 class UnifiedOnboardingRequest(BaseModel):
-    basicInfo: Optional[Dict[str, Any]] = {}
-    periodCycle: Optional[Dict[str, Any]] = {}
+    """
+    Onboarding payload shared by the web and Flutter clients. Consumers should
+    use model_dump(exclude_unset=True) so sections and keys the client did not
+    send stay absent and the .get() defaults downstream still apply.
+    """
+    basicInfo: BasicInfoModel = Field(default_factory=BasicInfoModel)
+    periodCycle: PeriodCycleData = Field(default_factory=PeriodCycleData)
     primaryGoal: Optional[str] = ""
-    weightGoal: Optional[Dict[str, Any]] = {}
-    sleepInfo: Optional[Dict[str, Any]] = {}
-    dietaryPreferences: Optional[Dict[str, Any]] = {}
-    workoutPreferences: Optional[Dict[str, Any]] = {}
-    exerciseSetup: Optional[Dict[str, Any]] = {}
\ No newline at end of file
+    weightGoal: WeightGoalModel = Field(default_factory=WeightGoalModel)
+    sleepInfo: SleepInfoModel = Field(default_factory=SleepInfoModel)
+    dietaryPreferences: DietaryPreferencesModel = Field(default_factory=DietaryPreferencesModel)
+    workoutPreferences: WorkoutPreferencesModel = Field(default_factory=WorkoutPreferencesModel)
+    exerciseSetup: ExerciseSetupModel = Field(default_factory=ExerciseSetupModel)
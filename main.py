@@ -3,31 +3,30 @@ Main application entry point for the nutrition and exercise coach API.
 Updated to support both web and Flutter applications with unified backend.
 """
 import os
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from fastapi import FastAPI
+import logging
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
 import traceback
-from config import DATABASE_URL
+from config import DATABASE_URL, setup_logging
 from api import router as api_router
 from database import init_database, User, SessionLocal
 from tasks import start_background_worker
-from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy import text, select
 from flutter_routes import health_router
 from sleep_api import router as sleep_router
 from meal_api import meal_router
-from exercise_api import exercise_router
+from exercise_api import exercise_router, start_exercise_writer, stop_exercise_writer
 
-# SQLAlchemy setup
-Base = declarative_base()
-engine = create_async_engine(DATABASE_URL, echo=True)
-SessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+setup_logging()
+logger = logging.getLogger(__name__)
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Unified Nutrition and Exercise Coach API",
     description="API for nutrition and exercise coaching - supports both web and mobile applications",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -39,6 +38,14 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+# Anything a route doesn't turn into an HTTPException ends up here, so routes
+# don't need their own catch-all try/except just to log and return a 500. The
+# error text stays in the log; it can carry SQL and constraint names.
+@app.exception_handler(Exception)
+async def unhandled_exception_handler(request: Request, exc: Exception):
+    logger.exception("Unhandled error on %s %s", request.method, request.url.path)
+    return JSONResponse(status_code=500, content={"detail": "Internal server error"})
+
 # Include API routes
 app.include_router(api_router, prefix="")  # Web frontend routes
 app.include_router(health_router)  # Flutter/mobile routes
@@ -53,6 +60,7 @@ async def startup():
     print(f"🔍 DATABASE_URL: {DATABASE_URL}") 
     await init_database()
     start_background_worker()
+    start_exercise_writer()
     
     # Verify database connection and show accurate user count
     print("Verifying unified database connection...")
@@ -79,6 +87,11 @@ async def startup():
         print(f"❌ Error during startup verification: {e}")
         traceback.print_exc()
 
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop the exercise writer so pending logs fail instead of hanging"""
+    await stop_exercise_writer()
+
 # Root endpoint for health check
 @app.get("/")
 async def root():
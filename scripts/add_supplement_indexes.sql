@@ -0,0 +1,47 @@
+-- Migration to add the supplement hot-path indexes
+-- scripts/add_supplement_indexes.sql
+--
+-- Run this before deploying to a database created without the unique
+-- indexes. It removes duplicate rows (keeping the most recent) so they can be
+-- built; the app only checks for them at startup and refuses to start if one
+-- is missing. Take a backup first: the DELETEs are not reversible.
+
+BEGIN;
+
+-- Keep one supplement_tracking row per user, day and supplement
+DELETE FROM supplement_tracking st
+USING supplement_tracking newer
+WHERE st.user_id = newer.user_id
+AND st.date = newer.date
+AND st.supplement_name = newer.supplement_name
+AND (COALESCE(st.created_at, '-infinity'), st.id)
+    < (COALESCE(newer.created_at, '-infinity'), newer.id);
+
+-- Keep one user_supplement_preferences row per user and supplement
+DELETE FROM user_supplement_preferences usp
+USING user_supplement_preferences newer
+WHERE usp.user_id = newer.user_id
+AND usp.supplement_name = newer.supplement_name
+AND (COALESCE(usp.updated_at, '-infinity'), usp.id)
+    < (COALESCE(newer.updated_at, '-infinity'), newer.id);
+
+-- Upsert arbiter for supplement logs; INCLUDE covers the daily status read
+CREATE UNIQUE INDEX IF NOT EXISTS supplement_tracking_user_date_name_unique
+ON supplement_tracking(user_id, date, supplement_name)
+INCLUDE (taken, time_taken, dosage);
+
+-- Upsert arbiter for supplement preferences
+CREATE UNIQUE INDEX IF NOT EXISTS user_supplement_preferences_user_name_unique
+ON user_supplement_preferences(user_id, supplement_name);
+
+-- Active preferences in display order, without a sort step
+CREATE INDEX IF NOT EXISTS idx_user_supplement_prefs_active
+ON user_supplement_preferences(user_id, created_at)
+WHERE is_active = true;
+
+COMMIT;
+
+-- Verify the changes
+SELECT indexname, indexdef
+FROM pg_indexes
+WHERE tablename IN ('supplement_tracking', 'user_supplement_preferences');
@@ -0,0 +1,76 @@
+# test_exercise_api.py
+"""
+Exercise log route and batched writer, with the database insert stubbed out
+"""
+import asyncio
+import os
+import uuid
+
+# config.py reads these at import time; nothing here connects or calls out
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://u:p@localhost/db")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import exercise_api
+
+LOG_BODY = {
+    "exercise_name": "Run",
+    "exercise_type": "cardio",
+    "duration_minutes": 30,
+}
+
+@pytest.fixture
+def client(monkeypatch):
+    """App with only the exercise router, and a fresh writer queue per test"""
+    monkeypatch.setattr(exercise_api, "_insert_queue", asyncio.Queue())
+    monkeypatch.setattr(exercise_api, "_writer_task", None)
+    app = FastAPI()
+    app.include_router(exercise_api.exercise_router)
+    with TestClient(app) as test_client:
+        yield test_client
+        test_client.portal.call(exercise_api.stop_exercise_writer)
+
+def test_malformed_user_id_is_422(client):
+    response = client.post("/api/health/exercise/log", json={**LOG_BODY, "user_id": "not-a-uuid"})
+    assert response.status_code == 422
+
+def test_unknown_user_is_404(client, monkeypatch):
+    async def insert_rows(batch):
+        # The users join drops rows for unknown users from RETURNING
+        return {}
+    monkeypatch.setattr(exercise_api, "_insert_rows", insert_rows)
+
+    response = client.post("/api/health/exercise/log", json={**LOG_BODY, "user_id": str(uuid.uuid4())})
+    assert response.status_code == 404
+
+def test_unknown_user_in_failed_batch_is_404(client, monkeypatch):
+    known_user = uuid.uuid4()
+
+    async def insert_rows(batch):
+        # A bad row fails the whole batch; retried singly, only it raises
+        if len(batch) > 1:
+            raise ValueError("batch failed")
+        params, _ = batch[0]
+        if params["duration_minutes"] < 0:
+            raise ValueError("bad row")
+        return {params["id"]: 100.0} if params["user_id"] == known_user else {}
+    monkeypatch.setattr(exercise_api, "_insert_rows", insert_rows)
+
+    async def log_all():
+        loop = asyncio.get_running_loop()
+        rows = [
+            {"id": uuid.uuid4(), "user_id": known_user, "duration_minutes": 30},
+            {"id": uuid.uuid4(), "user_id": uuid.uuid4(), "duration_minutes": 30},
+            {"id": uuid.uuid4(), "user_id": known_user, "duration_minutes": -1},
+        ]
+        items = [(params, loop.create_future()) for params in rows]
+        await exercise_api._write_batch(items)
+        return await asyncio.gather(*(future for _, future in items), return_exceptions=True)
+
+    saved, unknown, failed = client.portal.call(log_all)
+    assert saved == 100.0
+    assert unknown is None
+    assert isinstance(failed, ValueError)